@@ -2,31 +2,57 @@
 Whisper API Server for Railway Deployment
 Supports transcription from URLs with webhook callbacks
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
 import whisper
+import numpy as np
+import torch
 import os
-import requests
-from typing import Optional, List, Dict, Any
+import httpx
+import httpcore
+import orjson
+import msgspec
+import tempfile
+import time
+import hashlib
+import ipaddress
+import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Union
+from urllib.parse import urlsplit
 import logging
 import threading
 
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Concurrent request limiter
 MAX_CONCURRENT_TRANSCRIPTIONS = int(os.getenv("MAX_CONCURRENT", "3"))
-transcription_semaphore = threading.Semaphore(MAX_CONCURRENT_TRANSCRIPTIONS)
+transcription_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TRANSCRIPTIONS)
 active_transcriptions = 0
-transcription_lock = threading.Lock()
+
+# Model calls run on a dedicated pool so the event loop stays responsive
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="transcribe")
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Whisper Transcription API",
     description="Speech-to-text transcription service using OpenAI's Whisper",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -40,19 +66,474 @@ app.add_middleware(
 
 # Load model on startup
 MODEL_NAME = os.getenv("WHISPER_MODEL", "base")  # Default to 'base' for faster loading
-logger.info(f"Loading Whisper model: {MODEL_NAME}")
-model = whisper.load_model(MODEL_NAME)
-logger.info(f"Model {MODEL_NAME} loaded successfully")
+# Models kept resident so requests can pick one, e.g. "tiny,base"; always includes MODEL_NAME
+MODEL_NAMES = [name.strip() for name in os.getenv("WHISPER_MODELS", MODEL_NAME).split(",") if name.strip()]
+if MODEL_NAME not in MODEL_NAMES:
+    MODEL_NAMES.insert(0, MODEL_NAME)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "openai").lower()  # "openai" or "faster-whisper"
+WHISPER_QUANT = os.getenv("WHISPER_QUANT", "").lower()  # "int8" = dynamic int8 quantization (CPU only)
+WHISPER_PRECISION = os.getenv("WHISPER_PRECISION", "auto").lower()  # "auto" = fp16 on GPU, or "fp32"
+WHISPER_COMPUTE = os.getenv("WHISPER_COMPUTE", "int8")  # CTranslate2 compute type for faster-whisper
+NUM_WORKERS = int(os.getenv("NUM_WORKERS", "2"))  # Parallel CTranslate2 workers for faster-whisper
+WHISPER_SDPA = os.getenv("WHISPER_SDPA", "1") != "0"  # Fused scaled_dot_product_attention kernels
+WHISPER_COMPILE = os.getenv("WHISPER_COMPILE", "")  # torch.compile mode for the encoder, e.g. "reduce-overhead"
+AUDIO_CACHE_MB = int(os.getenv("AUDIO_CACHE_MB", "256"))  # Memory budget for decoded audio reuse
+MAX_AUDIO_MB = int(os.getenv("MAX_AUDIO_MB", "500"))  # Largest audio file accepted for download
+ALLOW_PRIVATE_URLS = os.getenv("ALLOW_PRIVATE_URLS", "0") == "1"  # Allow URLs resolving to internal addresses
+CUDA_MEMORY_FRACTION = os.getenv("CUDA_MEMORY_FRACTION")  # Optional cap on this process's share of GPU memory
 
+# Dispatches to FlashAttention / memory-efficient kernels on CUDA and the fused CPU kernel otherwise
+whisper.model.MultiHeadAttention.use_sdpa = WHISPER_SDPA and whisper.model.SDPA_AVAILABLE
 
-class TranscribeRequest(BaseModel):
-    """Request model for transcription"""
-    url: HttpUrl
+if torch.cuda.is_available():
+    # Encoder input shapes are fixed, so cuDNN autotuning pays off after the first window
+    torch.backends.cudnn.benchmark = True
+    torch.set_float32_matmul_precision("high")
+    if CUDA_MEMORY_FRACTION:
+        torch.cuda.set_per_process_memory_fraction(float(CUDA_MEMORY_FRACTION))
+
+
+class CompiledEncoder(torch.nn.Module):
+    """torch.compile'd encoder that returns outputs the caller may keep across calls"""
+
+    def __init__(self, encoder: torch.nn.Module):
+        super().__init__()
+        self.encoder = torch.compile(encoder, mode=WHISPER_COMPILE, dynamic=False)
+
+    def forward(self, mel: torch.Tensor) -> torch.Tensor:
+        # With CUDA graphs (mode="reduce-overhead") the output lives in the graph's static
+        # memory pool and is overwritten by the next replay, while decoding keeps using it
+        return self.encoder(mel).clone()
+
+
+def quantize_model(model: whisper.Whisper) -> torch.nn.Module:
+    """Replace the model's linear layers with dynamically quantized int8 versions"""
+    # whisper.model.Linear only adds a dtype cast to nn.Linear, but quantize_dynamic
+    # matches exact module types, so downcast them before quantizing
+    for module in model.modules():
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_model(name: str):
+    """Load a Whisper model and apply the configured optimizations"""
+    logger.info(f"Loading Whisper model: {name} (backend: {WHISPER_BACKEND})")
+    if WHISPER_BACKEND == "faster-whisper":
+        if WhisperModel is None:
+            raise RuntimeError("WHISPER_BACKEND=faster-whisper requires the faster-whisper package")
+        model = WhisperModel(
+            name,
+            device="cuda" if torch.cuda.is_available() else "cpu",
+            compute_type=WHISPER_COMPUTE,
+            num_workers=NUM_WORKERS,
+        )
+    elif WHISPER_QUANT == "int8":
+        # Quantized kernels (FBGEMM/QNNPACK) only run on CPU
+        model = quantize_model(whisper.load_model(name, device="cpu"))
+        logger.info(f"Model {name} quantized to int8")
+    else:
+        model = whisper.load_model(name)
+
+    if WHISPER_BACKEND != "faster-whisper":
+        logger.info(f"Fused attention (SDPA): {'enabled' if whisper.model.MultiHeadAttention.use_sdpa else 'disabled'}")
+        if WHISPER_COMPILE:
+            # transcribe() always feeds single 30-second windows, so the one static shape is
+            # compiled by the startup warmup
+            model.encoder = CompiledEncoder(model.encoder)
+            logger.info(f"Encoder compiled with torch.compile (mode: {WHISPER_COMPILE})")
+    logger.info(f"Model {name} loaded successfully")
+    return model
+
+
+models: Dict[str, Any] = {}
+# The KV-cache and alignment hooks Whisper installs during decoding live on the shared
+# decoder modules, so two decodes on the same model would read each other's caches
+model_locks: Dict[str, threading.Lock] = {}
+
+
+@app.on_event("startup")
+def load_models():
+    # Loaded at startup rather than import, so with several uvicorn workers only the
+    # worker processes hold models, not the supervisor that imported this module
+    for name in MODEL_NAMES:
+        models[name] = load_model(name)
+        model_locks[name] = threading.Lock()
+
+
+# Same headers as whisper's own URL download, some hosts reject unknown clients
+DOWNLOAD_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "*/*",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class AudioCache:
+    """LRU cache of decoded waveforms keyed by URL and file version (see cache_key)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self.lock:
+            audio = self.entries.get(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+            return audio
+
+    def put(self, key: str, audio: np.ndarray):
+        if audio.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = audio
+            self.size += audio.nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.nbytes
+
+
+audio_cache = AudioCache(AUDIO_CACHE_MB * 1024 * 1024)
+
+# Shared HTTP client for URL checks and audio downloads, keeps connections alive between requests
+client: Optional[httpx.AsyncClient] = None
+# Webhooks get their own client, so slow receivers can't use up the connections downloads need
+webhook_client: Optional[httpx.AsyncClient] = None
+
+# Webhooks are queued and sent by a pool of senders, so a slow receiver never holds a transcription slot
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "64"))
+webhook_queue = asyncio.Queue()
+webhook_senders: List[asyncio.Task] = []
+
+
+@app.on_event("startup")
+async def create_client():
+    global client, webhook_client
+    # Every connection, including each redirect hop, is checked by the transport
+    client = httpx.AsyncClient(
+        transport=create_transport(http2=True),
+        follow_redirects=True,
+        timeout=30,
+    )
+    webhook_client = httpx.AsyncClient(
+        transport=create_transport(
+            http2=True,
+            limits=httpx.Limits(max_connections=WEBHOOK_CONCURRENCY, max_keepalive_connections=WEBHOOK_CONCURRENCY),
+        ),
+        follow_redirects=True,
+        timeout=30,
+    )
+
+
+@app.on_event("shutdown")
+async def close_client():
+    try:
+        # Give queued webhooks a chance to go out before the connections are closed
+        await asyncio.wait_for(webhook_queue.join(), timeout=10)
+    except asyncio.TimeoutError:
+        logger.warning(f"Shutting down with {webhook_queue.qsize()} webhooks still queued")
+    for sender in webhook_senders:
+        sender.cancel()
+    await asyncio.gather(*webhook_senders, return_exceptions=True)
+    await client.aclose()
+    await webhook_client.aclose()
+    executor.shutdown(wait=False)
+
+
+@asynccontextmanager
+async def download_audio(audio_url: str, response: httpx.Response, pipe: asyncio.StreamWriter):
+    """Download the response body to a temporary file while also streaming it into `pipe`, yielding the file's path"""
+    suffix = os.path.splitext(audio_url)[1] if audio_url.lower().endswith((".mp3", ".wav", ".m4a", ".flac", ".ogg")) else ".mp3"
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with temp_file:
+            async for chunk in response.aiter_bytes(1 << 16):
+                temp_file.write(chunk)
+                # Content-Length can be missing or wrong, so also enforce the limit while downloading
+                if temp_file.tell() > MAX_AUDIO_MB * 1024 * 1024:
+                    raise HTTPException(status_code=413, detail=f"Audio file is larger than {MAX_AUDIO_MB} MB")
+                if pipe.is_closing():
+                    continue
+                try:
+                    pipe.write(chunk)
+                    await pipe.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The reader gave up on the stream; keep downloading to the file
+                    pipe.close()
+        pipe.close()
+        yield temp_file.name
+    finally:
+        pipe.close()
+        os.unlink(temp_file.name)
+
+
+def cache_key(audio_url: str, headers: httpx.Headers) -> Optional[str]:
+    """Cache key for a download, or None when the server doesn't identify the file's version"""
+    if headers.get("etag"):
+        version = [headers["etag"]]
+    elif headers.get("last-modified") and headers.get("content-length"):
+        version = [headers["last-modified"], headers["content-length"]]
+    else:
+        return None
+    return hashlib.sha256(orjson.dumps([audio_url, *version])).hexdigest()
+
+
+# Content types a server may report for audio; anything else (e.g. an HTML page) is rejected early
+AUDIO_CONTENT_TYPES = ("audio/", "video/", "application/octet-stream", "binary/octet-stream", "application/ogg", "application/mp4")
+
+
+async def resolve_public_host(host: str) -> str:
+    """Resolve `host` to an address, rejecting it if any of its addresses is private, loopback or otherwise non-public"""
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except OSError:
+        raise HTTPException(status_code=400, detail=f"Could not resolve host: {host}")
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0]).is_global:
+            raise HTTPException(status_code=400, detail=f"URL host is not a public address: {host}")
+    return addresses[0][4][0]
+
+
+async def check_public_host(url: str):
+    """Reject URLs whose host is not public, before any work is queued for them"""
+    await resolve_public_host(urlsplit(url).hostname)
+
+
+class PublicNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that only opens connections to public addresses"""
+
+    def __init__(self):
+        self.backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout=None, local_address=None, socket_options=None):
+        # Connect to the address that was checked instead of letting the backend resolve the
+        # name again, which a DNS rebinding host would answer with an internal address.
+        # TLS still uses the URL's host name for SNI and certificate verification.
+        address = await resolve_public_host(host)
+        return await self.backend.connect_tcp(
+            address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+        )
+
+    async def connect_unix_socket(self, path: str, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Unix socket connections are not allowed")
+
+    async def sleep(self, seconds: float):
+        await self.backend.sleep(seconds)
+
+
+def create_transport(**kwargs) -> httpx.AsyncHTTPTransport:
+    """HTTP transport that refuses non-public addresses unless ALLOW_PRIVATE_URLS is set"""
+    transport = httpx.AsyncHTTPTransport(**kwargs)
+    if not ALLOW_PRIVATE_URLS:
+        # httpx doesn't expose httpcore's network_backend option, so set it on the pool
+        transport._pool._network_backend = PublicNetworkBackend()
+    return transport
+
+
+async def check_audio_url(audio_url: str):
+    """Cheap checks before queuing any work: public host, and size and type from a HEAD request"""
+    # The client's transport checks the host of the HEAD request and every redirect
+    try:
+        response = await client.head(audio_url, headers=DOWNLOAD_HEADERS, timeout=5)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=400, detail=f"Audio URL is not reachable: {str(e)}")
+
+    # Some hosts (e.g. presigned GET URLs) refuse HEAD; the download still enforces the size limit
+    if not response.is_success:
+        return
+
+    content_length = response.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_AUDIO_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"Audio file is larger than {MAX_AUDIO_MB} MB")
+
+    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type and not content_type.startswith(AUDIO_CONTENT_TYPES):
+        raise HTTPException(status_code=415, detail=f"URL does not point to audio (Content-Type: {content_type})")
+
+
+async def fetch_audio(audio_url: str) -> np.ndarray:
+    """Download and decode audio from a URL, reusing cached audio when the file hasn't changed"""
+    async with client.stream("GET", audio_url, headers=DOWNLOAD_HEADERS) as response:
+        response.raise_for_status()
+        # Looked up from the response headers, so a hit skips both the body and the decode
+        key = cache_key(audio_url, response.headers)
+        audio = audio_cache.get(key) if key else None
+        if audio is not None:
+            logger.info(f"Audio cache hit for: {audio_url}")
+            return audio
+
+        audio = await decode_audio(audio_url, response)
+
+    if key:
+        audio_cache.put(key, audio)
+    return audio
+
+
+async def decode_audio(audio_url: str, response: httpx.Response) -> np.ndarray:
+    """Decode the audio in a response body, decoding while the download is in progress"""
+    # Same conversion as whisper.load_audio, but reading from stdin so ffmpeg
+    # decodes each chunk as it arrives instead of waiting for the whole file.
+    # fmt: off
+    cmd = [
+        "ffmpeg",
+        "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(whisper.audio.SAMPLE_RATE),
+        "-"
+    ]
+    # fmt: on
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    # Drain stdout concurrently so ffmpeg never stalls on a full pipe
+    output = asyncio.ensure_future(process.stdout.read())
+    try:
+        async with download_audio(audio_url, response, process.stdin) as path:
+            out = await output
+            if await process.wait() == 0:
+                audio = np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+            else:
+                # Some containers (e.g. mp4 with the index at the end) can't be decoded from a pipe
+                audio = await run_in_threadpool(whisper.load_audio, path)
+    finally:
+        output.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    return audio
+
+
+def segment_to_dict(segment) -> dict:
+    """Convert a faster-whisper segment into Whisper's segment schema"""
+    result = {
+        "id": segment.id,
+        "seek": segment.seek,
+        "start": segment.start,
+        "end": segment.end,
+        "text": segment.text,
+        "tokens": segment.tokens,
+        "temperature": segment.temperature,
+        "avg_logprob": segment.avg_logprob,
+        "compression_ratio": segment.compression_ratio,
+        "no_speech_prob": segment.no_speech_prob,
+    }
+    if segment.words is not None:
+        result["words"] = [
+            {"word": word.word, "start": word.start, "end": word.end, "probability": word.probability}
+            for word in segment.words
+        ]
+    return result
+
+
+def transcribe(model_name: str, audio: np.ndarray, options: dict) -> dict:
+    """Transcribe a waveform with the configured backend, returning Whisper's result schema"""
+    model = models[model_name]
+    if WHISPER_BACKEND != "faster-whisper":
+        # Half precision halves memory traffic on GPU; Whisper falls back to fp32 on CPU anyway
+        fp16 = model.device.type == "cuda" and WHISPER_PRECISION != "fp32"
+        with model_locks[model_name]:
+            return model.transcribe(audio, fp16=fp16, **options)
+
+    segments, info = model.transcribe(audio, **options)
+    segments = [segment_to_dict(segment) for segment in segments]
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "language": info.language,
+        "segments": segments,
+    }
+
+
+async def run_transcription(model_name: str, audio: np.ndarray, options: dict) -> dict:
+    """Run transcribe() on the transcription pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, transcribe, model_name, audio, options)
+
+
+# Transcriptions in progress, keyed by URL, model and options, so duplicate submissions
+# (e.g. webhook retries) share a single run instead of each running the model
+inflight: Dict[bytes, asyncio.Task] = {}
+
+
+async def _transcribe_url(audio_url: str, model_name: str, options: dict) -> dict:
+    audio = await fetch_audio(audio_url)
+    return await run_transcription(model_name, audio, options)
+
+
+async def transcribe_url(audio_url: str, model_name: str, options: dict) -> dict:
+    """Download and transcribe audio, joining an identical transcription already in progress"""
+    key = hashlib.sha1(orjson.dumps([audio_url, model_name, options], option=orjson.OPT_SORT_KEYS)).digest()
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_transcribe_url(audio_url, model_name, options))
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    else:
+        logger.info(f"Joining transcription already in progress for: {audio_url}")
+    # Shielded so that one caller going away doesn't cancel the run for the others
+    return await asyncio.shield(task)
+
+
+@app.on_event("startup")
+async def warm_up_model():
+    """Run a dummy transcription so the first request doesn't pay for lazy initialization"""
+    # CUDA context, cuBLAS workspaces, mel filters and tokenizer are all set up on first use
+    for name, model in models.items():
+        start = time.perf_counter()
+        await run_transcription(name, np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32), {})
+        if WHISPER_BACKEND != "faster-whisper":
+            # Compile the DTW used for word timestamps (numba on CPU, triton on CUDA)
+            await run_in_threadpool(whisper.timing.dtw, torch.zeros((2, 2), device=model.device))
+        logger.info(f"Model {name} warmed up in {time.perf_counter() - start:.2f}s")
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def is_http_url(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and bool(parts.netloc)
+
+
+class TranscribeRequest(msgspec.Struct):
+    """Request body for transcription, decoded with msgspec (much cheaper than pydantic validation)"""
+    url: str
     language: Optional[str] = None
     task: str = "transcribe"  # "transcribe" or "translate"
     word_timestamps: bool = False
     temperature: float = 0.0
-    webhook_url: Optional[HttpUrl] = None  # Optional webhook callback URL
+    webhook_url: Optional[str] = None  # Optional webhook callback URL
+    model: Optional[str] = None  # One of the loaded models (WHISPER_MODELS), defaults to WHISPER_MODEL
+    columnar: bool = False  # Return segments as one array per field instead of a list of dicts
+
+    def __post_init__(self):
+        if not is_http_url(self.url):
+            raise ValueError("`url` must be an http(s) URL")
+        if self.webhook_url is not None and not is_http_url(self.webhook_url):
+            raise ValueError("`webhook_url` must be an http(s) URL")
+
+
+class TranscribeRequestModel(BaseModel):
+    """Request model for transcription, only used for the OpenAPI docs"""
+    url: HttpUrl
+    language: Optional[str] = None
+    task: str = "transcribe"
+    word_timestamps: bool = False
+    temperature: float = 0.0
+    webhook_url: Optional[HttpUrl] = None
+    model: Optional[str] = None
+    columnar: bool = False
 
 
 class TranscribeResponse(BaseModel):
@@ -62,23 +543,60 @@ class TranscribeResponse(BaseModel):
     segments: List[Dict[str, Any]]
 
 
+class ColumnarTranscribeResponse(BaseModel):
+    """Response model for transcription with columnar segments"""
+    text: str
+    language: str
+    starts: List[float]
+    ends: List[float]
+    texts: List[str]
+    tokens: List[List[int]]
+    word_starts: Optional[List[float]] = None
+    word_ends: Optional[List[float]] = None
+    words: Optional[List[str]] = None
+    word_probabilities: Optional[List[float]] = None
+
+
 class AsyncTranscribeResponse(BaseModel):
     """Response for async transcription with webhook"""
     status: str
     message: str
 
 
+def format_result(result: dict, columnar: bool) -> dict:
+    """Build the response body, with segments either as a list of dicts or as columns"""
+    body = {"text": result["text"], "language": result["language"]}
+    segments = result["segments"]
+    if not columnar:
+        body["segments"] = segments
+        return body
+
+    # One array per field avoids repeating every key for every segment
+    body["starts"] = [segment["start"] for segment in segments]
+    body["ends"] = [segment["end"] for segment in segments]
+    body["texts"] = [segment["text"] for segment in segments]
+    body["tokens"] = [segment["tokens"] for segment in segments]
+
+    if any("words" in segment for segment in segments):
+        words = [word for segment in segments for word in segment.get("words", [])]
+        body["word_starts"] = [word["start"] for word in words]
+        body["word_ends"] = [word["end"] for word in words]
+        body["words"] = [word["word"] for word in words]
+        body["word_probabilities"] = [word["probability"] for word in words]
+
+    return body
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    with transcription_lock:
-        active = active_transcriptions
-    
     return {
         "status": "ok",
         "message": "Whisper API is running",
         "model": MODEL_NAME,
-        "active_transcriptions": active,
+        "models": list(models),
+        "backend": WHISPER_BACKEND,
+        "active_transcriptions": active_transcriptions,
         "max_concurrent": MAX_CONCURRENT_TRANSCRIPTIONS,
         "endpoints": {
             "transcribe": "/transcribe (POST)",
@@ -94,33 +612,53 @@ async def health():
     return {"status": "healthy", "model": MODEL_NAME}
 
 
-def send_webhook(webhook_url: str, data: dict):
+async def send_webhook(webhook_url: str, data: dict):
     """Send result to webhook URL"""
     try:
-        response = requests.post(webhook_url, json=data, timeout=10)
+        response = await webhook_client.post(
+            webhook_url,
+            content=orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY),
+            headers={"Content-Type": "application/json"},
+            timeout=10,
+        )
         logger.info(f"Webhook sent to {webhook_url}, status: {response.status_code}")
     except Exception as e:
         logger.error(f"Failed to send webhook: {str(e)}")
 
 
-def process_transcription(audio_url: str, options: dict, webhook_url: Optional[str]):
+async def webhook_sender():
+    """Send queued webhooks one at a time; several senders share the webhook client's HTTP/2 connections"""
+    while True:
+        webhook_url, data = await webhook_queue.get()
+        try:
+            await send_webhook(webhook_url, data)
+        finally:
+            webhook_queue.task_done()
+
+
+@app.on_event("startup")
+async def start_webhook_senders():
+    webhook_senders.extend(asyncio.ensure_future(webhook_sender()) for _ in range(WEBHOOK_CONCURRENCY))
+
+
+async def process_transcription(audio_url: str, options: dict, webhook_url: Optional[str], columnar: bool = False, model_name: str = MODEL_NAME):
     """Background task for transcription with webhook callback"""
     global active_transcriptions
     
-    # Wait for available slot
-    if not transcription_semaphore.acquire(blocking=False):
+    # Reject instead of waiting when all slots are taken
+    if transcription_semaphore.locked():
         logger.warning(f"Too many concurrent transcriptions, rejecting: {audio_url}")
         if webhook_url:
             error_data = {"status": "error", "error": "Server busy, too many concurrent requests"}
-            send_webhook(webhook_url, error_data)
+            webhook_queue.put_nowait((webhook_url, error_data))
         return
     
+    await transcription_semaphore.acquire()
     try:
-        with transcription_lock:
-            active_transcriptions += 1
+        active_transcriptions += 1
         
-        logger.info(f"Background transcription started for: {audio_url} (Active: {active_transcriptions})")
-        result = model.transcribe(audio_url, **options)
+        logger.info(f"Background transcription started for: {audio_url} with model {model_name} (Active: {active_transcriptions})")
+        result = await transcribe_url(audio_url, model_name, options)
         logger.info(f"Background transcription completed. Language: {result['language']}")
         
         # Force garbage collection to free memory
@@ -129,13 +667,8 @@ def process_transcription(audio_url: str, options: dict, webhook_url: Optional[s
         
         if webhook_url:
             # Send result to webhook
-            webhook_data = {
-                "status": "completed",
-                "text": result["text"],
-                "language": result["language"],
-                "segments": result["segments"]
-            }
-            send_webhook(webhook_url, webhook_data)
+            webhook_data = {"status": "completed", **format_result(result, columnar)}
+            webhook_queue.put_nowait((webhook_url, webhook_data))
     except Exception as e:
         logger.error(f"Background transcription error: {str(e)}")
         if webhook_url:
@@ -144,10 +677,9 @@ def process_transcription(audio_url: str, options: dict, webhook_url: Optional[s
                 "status": "error",
                 "error": str(e)
             }
-            send_webhook(webhook_url, error_data)
+            webhook_queue.put_nowait((webhook_url, error_data))
     finally:
-        with transcription_lock:
-            active_transcriptions -= 1
+        active_transcriptions -= 1
         transcription_semaphore.release()
         
         # Force garbage collection after each transcription
@@ -156,8 +688,19 @@ def process_transcription(audio_url: str, options: dict, webhook_url: Optional[s
         logger.info(f"Transcription slot freed (Active: {active_transcriptions})")
 
 
-@app.post("/transcribe", response_model=TranscribeResponse)
-async def transcribe_audio(request: TranscribeRequest, background_tasks: BackgroundTasks):
+# The body is decoded with msgspec and responses are serialized by orjson directly,
+# the pydantic models are only used for the OpenAPI docs
+@app.post(
+    "/transcribe",
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": TranscribeRequestModel.model_json_schema()}},
+            "required": True,
+        }
+    },
+    responses={200: {"model": Union[TranscribeResponse, ColumnarTranscribeResponse, AsyncTranscribeResponse]}},
+)
+async def transcribe_audio(http_request: Request, background_tasks: BackgroundTasks):
     """
     Transcribe audio from a URL
     
@@ -168,6 +711,8 @@ async def transcribe_audio(request: TranscribeRequest, background_tasks: Backgro
     - word_timestamps: Extract word-level timestamps
     - temperature: Sampling temperature (0.0 = deterministic)
     - webhook_url: Optional webhook URL for async callback
+    - columnar: Return segments as parallel arrays (starts, ends, texts, tokens, ...) instead of a list
+    - model: Which loaded model to use (see "models" on /), defaults to WHISPER_MODEL
     
     If webhook_url is provided: Returns 202 Accepted immediately, sends result to webhook when done
     If no webhook_url: Returns result synchronously (may take longer)
@@ -176,7 +721,26 @@ async def transcribe_audio(request: TranscribeRequest, background_tasks: Backgro
     - text: Full transcribed text
     - language: Detected or specified language
     - segments: List of segments with timestamps and text
+      (or starts/ends/texts/tokens and word_* arrays when columnar is set)
     """
+    global active_transcriptions
+
+    try:
+        request = msgspec.json.decode(await http_request.body(), type=TranscribeRequest)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    model_name = request.model or MODEL_NAME
+    if model_name not in models:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model '{model_name}' is not loaded, available models: {', '.join(models)}"
+        )
+    
+    await check_audio_url(request.url)
+    if request.webhook_url and not ALLOW_PRIVATE_URLS:
+        await check_public_host(request.webhook_url)
+    
     # Prepare options
     options = {
         "task": request.task,
@@ -191,29 +755,36 @@ async def transcribe_audio(request: TranscribeRequest, background_tasks: Backgro
     if request.webhook_url:
         background_tasks.add_task(
             process_transcription,
-            str(request.url),
+            request.url,
             options,
-            str(request.webhook_url)
+            request.webhook_url,
+            request.columnar,
+            model_name
         )
         logger.info(f"Async transcription queued for: {request.url}")
-        return {"status": "accepted", "message": "Transcription started, result will be sent to webhook"}
+        return ORJSONResponse({"status": "accepted", "message": "Transcription started, result will be sent to webhook"})
     
     # Otherwise process synchronously
     try:
-        logger.info(f"Transcribing audio from URL: {request.url}")
-        result = model.transcribe(str(request.url), **options)
+        logger.info(f"Transcribing audio from URL: {request.url} with model {model_name}")
+        async with transcription_semaphore:
+            # Counted like background transcriptions, so / reports every held slot
+            active_transcriptions += 1
+            try:
+                result = await transcribe_url(request.url, model_name, options)
+            finally:
+                active_transcriptions -= 1
         logger.info(f"Transcription completed. Language: {result['language']}")
         
         # Force garbage collection to free memory
         import gc
         gc.collect()
         
-        return TranscribeResponse(
-            text=result["text"],
-            language=result["language"],
-            segments=result["segments"]
-        )
+        return ORJSONResponse(format_result(result, request.columnar))
         
+    except HTTPException:
+        # Rejected URLs (non-public host, too large) keep their status code
+        raise
     except Exception as e:
         logger.error(f"Transcription error: {str(e)}")
         raise HTTPException(
@@ -229,4 +800,15 @@ async def transcribe_audio(request: TranscribeRequest, background_tasks: Backgro
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # uvloop and httptools come with uvicorn[standard]; request them explicitly instead of
+    # silently falling back to asyncio/h11. Multiple workers need an import string, and
+    # every worker process loads its own copy of the models.
+    uvicorn.run(
+        "api:app" if workers > 1 else app,
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+    )
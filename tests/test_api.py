@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+msgspec = pytest.importorskip("msgspec")
+orjson = pytest.importorskip("orjson")
+
+import api  # noqa: E402
+
+
+def make_segment(start, end, text, words=None):
+    segment = {"start": start, "end": end, "text": text, "tokens": [1, 2]}
+    if words is not None:
+        segment["words"] = words
+    return segment
+
+
+def make_word(start, end, word):
+    return {"start": start, "end": end, "word": word, "probability": 0.5}
+
+
+def test_format_result_segments():
+    result = {
+        "text": " hi",
+        "language": "en",
+        "segments": [make_segment(0.0, 1.0, " hi")],
+    }
+    body = api.format_result(result, columnar=False)
+
+    assert body == {"text": " hi", "language": "en", "segments": result["segments"]}
+
+
+def test_format_result_columnar():
+    segments = [make_segment(0.0, 1.0, " a"), make_segment(1.0, 2.5, " b")]
+    result = {"text": " a b", "language": "en", "segments": segments}
+    body = api.format_result(result, columnar=True)
+
+    assert body["starts"] == [0.0, 1.0]
+    assert body["ends"] == [1.0, 2.5]
+    assert body["texts"] == [" a", " b"]
+    assert body["tokens"] == [[1, 2], [1, 2]]
+    assert "segments" not in body
+    assert "words" not in body
+
+
+def test_format_result_columnar_words():
+    segments = [
+        make_segment(
+            0.0, 1.0, " a b", [make_word(0.0, 0.4, " a"), make_word(0.5, 1.0, " b")]
+        ),
+        make_segment(1.0, 2.0, " c", [make_word(1.0, 2.0, " c")]),
+    ]
+    result = {"text": " a b c", "language": "en", "segments": segments}
+    body = api.format_result(result, columnar=True)
+
+    assert body["words"] == [" a", " b", " c"]
+    assert body["word_starts"] == [0.0, 0.5, 1.0]
+    assert body["word_ends"] == [0.4, 1.0, 2.0]
+    assert body["word_probabilities"] == [0.5, 0.5, 0.5]
+
+
+def test_format_result_columnar_empty():
+    result = {"text": "", "language": "en", "segments": []}
+    body = api.format_result(result, columnar=True)
+
+    assert body == {
+        "text": "",
+        "language": "en",
+        "starts": [],
+        "ends": [],
+        "texts": [],
+        "tokens": [],
+    }
+
+
+def test_audio_cache_lru_order():
+    cache = api.AudioCache(max_bytes=3 * 400)
+    for key in "abc":
+        cache.put(key, np.zeros(100, dtype=np.float32))
+
+    assert cache.get("a") is not None
+    cache.put("d", np.zeros(100, dtype=np.float32))
+
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.get("b") is None
+
+
+def test_audio_cache_byte_bound():
+    cache = api.AudioCache(max_bytes=1000)
+    cache.put("a", np.zeros(100, dtype=np.float32))
+    cache.put("b", np.zeros(100, dtype=np.float32))
+    cache.put("c", np.zeros(200, dtype=np.float32))
+
+    assert list(cache.entries) == ["c"]
+    assert cache.size == 800
+
+
+def test_audio_cache_too_large():
+    cache = api.AudioCache(max_bytes=1000)
+    cache.put("a", np.zeros(100, dtype=np.float32))
+    cache.put("big", np.zeros(1000, dtype=np.float32))
+
+    assert cache.get("big") is None
+    assert cache.get("a") is not None
+    assert cache.size == 400
+
+
+def test_cache_key():
+    url = "https://example.com/a.mp3"
+    etag = httpx.Headers({"etag": '"abc"'})
+    dated = httpx.Headers(
+        {"last-modified": "Mon, 01 Jan 2024 00:00:00 GMT", "content-length": "10"}
+    )
+
+    assert api.cache_key(url, etag) == api.cache_key(url, etag)
+    assert api.cache_key(url, etag) != api.cache_key("https://example.com/b.mp3", etag)
+    assert api.cache_key(url, etag) != api.cache_key(
+        url, httpx.Headers({"etag": '"abd"'})
+    )
+    assert api.cache_key(url, dated) is not None
+    assert api.cache_key(url, httpx.Headers({"content-length": "10"})) is None
+
+
+def decode_request(body: dict) -> "api.TranscribeRequest":
+    return msgspec.json.decode(orjson.dumps(body), type=api.TranscribeRequest)
+
+
+def test_transcribe_request_valid():
+    request = decode_request(
+        {"url": "https://example.com/a.mp3", "webhook_url": "http://example.com/hook"}
+    )
+
+    assert request.url == "https://example.com/a.mp3"
+    assert request.webhook_url == "http://example.com/hook"
+    assert request.task == "transcribe"
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["file:///etc/passwd", "ftp://example.com/a.mp3", "example.com/a.mp3", "http://"],
+)
+def test_transcribe_request_rejects_non_http_url(url):
+    with pytest.raises(msgspec.ValidationError, match="`url`"):
+        decode_request({"url": url})
+
+
+def test_transcribe_request_rejects_non_http_webhook():
+    with pytest.raises(msgspec.ValidationError, match="`webhook_url`"):
+        decode_request(
+            {"url": "https://example.com/a.mp3", "webhook_url": "file:///tmp/x"}
+        )
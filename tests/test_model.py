@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+import torch
+
+from whisper.model import SDPA_AVAILABLE, MultiHeadAttention, disable_sdpa
+
+requires_sdpa = pytest.mark.skipif(
+    not SDPA_AVAILABLE, reason="scaled_dot_product_attention unavailable"
+)
+
+
+def uses_sdpa(attn: MultiHeadAttention, x: torch.Tensor) -> bool:
+    # only the unfused path returns the attention weights
+    _, qk = attn(x)
+    return qk is None
+
+
+@requires_sdpa
+def test_disable_sdpa_is_thread_local():
+    attn = MultiHeadAttention(n_state=8, n_head=2)
+    x = torch.randn(1, 4, 8)
+    entered, release = threading.Event(), threading.Event()
+    results = {}
+
+    def align():
+        with disable_sdpa():
+            results["inside"] = uses_sdpa(attn, x)
+            entered.set()
+            release.wait()
+        results["after"] = uses_sdpa(attn, x)
+
+    thread = threading.Thread(target=align)
+    thread.start()
+    try:
+        assert entered.wait(timeout=10)
+        assert uses_sdpa(attn, x)
+    finally:
+        release.set()
+        thread.join()
+
+    assert results == {"inside": False, "after": True}
+
+
+@requires_sdpa
+def test_disable_sdpa_restores_state():
+    attn = MultiHeadAttention(n_state=8, n_head=2)
+    x = torch.randn(1, 4, 8)
+
+    with disable_sdpa():
+        with disable_sdpa():
+            assert not uses_sdpa(attn, x)
+        assert not uses_sdpa(attn, x)
+    assert uses_sdpa(attn, x)
+
+    with pytest.raises(RuntimeError):
+        with disable_sdpa():
+            raise RuntimeError
+    assert uses_sdpa(attn, x)
@@ -3,7 +3,7 @@ import pytest
 import scipy.ndimage
 import torch
 
-from whisper.timing import dtw_cpu, dtw_cuda, median_filter
+from whisper.timing import backtrace, dtw_cpu, dtw_cuda, median_filter
 
 sizes = [
     (10, 20),
@@ -61,9 +61,39 @@ def test_dtw_cuda_equivalence(N: int, M: int):
     trace_cpu = dtw_cpu(x_numpy)
     trace_cuda = dtw_cuda(x_cuda)
 
+    assert trace_cpu.shape == trace_cuda.shape
     assert np.allclose(trace_cpu, trace_cuda)
 
 
+@pytest.mark.parametrize("dtype", [np.int32, np.float32])
+def test_backtrace(dtype):
+    # 0 = diagonal, 1 = up, 2 = left; the first row and column are overwritten
+    trace = np.array(
+        [
+            [-1, -1, -1, -1],
+            [-1, 0, 2, 2],
+            [-1, 1, 0, 0],
+        ],
+        dtype=dtype,
+    )
+    path = backtrace(trace)
+
+    assert path.shape == (2, 3)
+    assert np.array_equal(path, [[0, 0, 1], [0, 1, 2]])
+
+
+@pytest.mark.parametrize("N, M", sizes)
+def test_dtw_cpu_input_dtypes(N: int, M: int):
+    # dtw() passes float64 to dtw_cpu, the tests above use float32
+    x = np.random.random((N, M)).astype(np.float32)
+
+    trace_32 = dtw_cpu(x)
+    trace_64 = dtw_cpu(x.astype(np.float64))
+
+    assert trace_32.shape[0] == 2 and trace_32.shape[1] >= max(N, M)
+    assert np.array_equal(trace_32, trace_64)
+
+
 @pytest.mark.parametrize("shape", shapes)
 def test_median_filter(shape):
     x = torch.randn(*shape)
@@ -1,5 +1,6 @@
 import base64
 import gzip
+import threading
 from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import Dict, Iterable, Optional, Tuple
@@ -68,14 +69,19 @@ def sinusoids(length, channels, max_timescale=10000):
     return torch.cat([torch.sin(scaled_time), torch.cos(scaled_time)], dim=1)
 
 
+# disable_sdpa() only applies to the calling thread, so that word-level alignment in one
+# thread does not switch concurrent transcriptions to the unfused attention path.
+_sdpa_state = threading.local()
+
+
 @contextmanager
 def disable_sdpa():
-    prev_state = MultiHeadAttention.use_sdpa
+    prev_state = getattr(_sdpa_state, "disabled", False)
     try:
-        MultiHeadAttention.use_sdpa = False
+        _sdpa_state.disabled = True
         yield
     finally:
-        MultiHeadAttention.use_sdpa = prev_state
+        _sdpa_state.disabled = prev_state
 
 
 class MultiHeadAttention(nn.Module):
@@ -120,7 +126,11 @@ class MultiHeadAttention(nn.Module):
         k = k.view(*k.shape[:2], self.n_head, -1).permute(0, 2, 1, 3)
         v = v.view(*v.shape[:2], self.n_head, -1).permute(0, 2, 1, 3)
 
-        if SDPA_AVAILABLE and MultiHeadAttention.use_sdpa:
+        if (
+            SDPA_AVAILABLE
+            and MultiHeadAttention.use_sdpa
+            and not getattr(_sdpa_state, "disabled", False)
+        ):
             a = scaled_dot_product_attention(
                 q, k, v, is_causal=mask is not None and n_ctx > 1
             )
@@ -54,7 +54,7 @@ def median_filter(x: torch.Tensor, filter_width: int):
     return result
 
 
-@numba.jit(nopython=True)
+@numba.jit(nopython=True, cache=True)
 def backtrace(trace: np.ndarray):
     i = trace.shape[0] - 1
     j = trace.shape[1] - 1
@@ -79,11 +79,14 @@ def backtrace(trace: np.ndarray):
     return result[::-1, :].T
 
 
-@numba.jit(nopython=True, parallel=True)
+# the DP has a loop-carried dependency, so there is nothing to parallelize; fastmath is
+# not safe either, since the cost matrix relies on inf. cache=True avoids paying the JIT
+# compilation on the first word-timestamp request of every process.
+@numba.jit(nopython=True, cache=True)
 def dtw_cpu(x: np.ndarray):
     N, M = x.shape
     cost = np.ones((N + 1, M + 1), dtype=np.float32) * np.inf
-    trace = -np.ones((N + 1, M + 1), dtype=np.float32)
+    trace = -np.ones((N + 1, M + 1), dtype=np.int32)
 
     cost[0, 0] = 0
     for j in range(1, M + 1):